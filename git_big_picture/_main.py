@@ -32,7 +32,7 @@ import sys
 import tempfile
 import textwrap
 import time
-from typing import List
+from typing import Callable, List, Optional
 
 __version__ = '1.3.0'
 __docformat__ = "restructuredtext"
@@ -415,13 +415,16 @@ def run_graphviz_command(argv: List[str],
                          enoent_exit_code: int,
                          nonzero_exit_code: int,
                          exception_exit_code: int,
-                         hint: str = ''):
+                         hint: str = '',
+                         _popen: Optional[Callable[..., subprocess.Popen]] = None):
     tool = argv[0]
+    # NOTE: Resolved at call time so that patching subprocess.Popen keeps working
+    popen_class = _popen or subprocess.Popen
     try:
-        p = subprocess.Popen(argv,
-                             stdin=subprocess.PIPE,
-                             stdout=subprocess.PIPE,
-                             stderr=subprocess.PIPE)
+        p = popen_class(argv,
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE)
     except OSError as e:
         if e.errno == errno.ENOENT:
             barf(f'{tool!r} not found! Please install the Graphviz utility.', enoent_exit_code)
@@ -779,7 +782,8 @@ class Git:
         parents = {}
         lines = self(['git', 'rev-list', '--all', '--parents'])
         for line in lines:
-            sha_ones = [e.group(0) for e in re.finditer(sha1_pattern, line)]
+            # Interned so that children and parents share one string per sha1
+            sha_ones = [sys.intern(sha_one) for sha_one in sha1_pattern.findall(line)]
             count = len(sha_ones)
             if count > 1:
                 parents[sha_ones[0]] = set(sha_ones[1:])
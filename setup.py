@@ -30,8 +30,8 @@ _tests_require = [
     # Keep in sync with test_requirements.txt
     'coverage',
     'cram',
-    'parameterized',
     'pytest',
+    'pytest-subtests',
 ]
 
 _extras_require = {
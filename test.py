@@ -22,58 +22,230 @@
 import os
 import shlex
 import shutil as sh
+import subprocess
 import sys
 import tempfile as tf
+import time
 import unittest as ut
 from io import StringIO
-from textwrap import dedent
 from unittest.mock import patch
 
-from parameterized import parameterized
-
 import git_big_picture._main as gbp
 
-# The only reason these global commands work, is because we change the cwd of
-# the test script... ugly.
+# The well-known hash of the empty tree, Git knows it even if no object exists
+EMPTY_TREE = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+NULL_SHA1 = '0' * 40
+
+# Prefer a RAM-backed location for the short-lived test repositories
+_SCRATCH_DIR = os.environ.get('XDG_RUNTIME_DIR',
+                              '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp')
+
+# Keeps repositories of concurrent pytest-xdist workers apart
+_WORKER_ID = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+
+# Parsing does not alter the parser, so all tests can share one
+_PARSER = gbp.create_parser()
+
+_EXPECTED_STDERR_NONZERO = ("fatal: 'bash' terminated prematurely with error code 1.\n"
+                            "The error from 'bash' was:\n"
+                            ">>>hello\n"
+                            "world\n"
+                            "\n")
+
+# Scratch ref every commit of build_graph is made on, deleted at the end
+_BUILD_GRAPH_REF = 'refs/git-big-picture-testing/build-graph'
+
+
+def dispatch_argv(argv, cwd=None):
+    return gbp.get_command_output(argv, cwd=cwd)
+
+
+def dispatch_argv_with_input(argv, input_bytes, cwd=None):
+    """ Like dispatch_argv, but feed input_bytes to the command's stdin. """
+    return subprocess.run(argv, input=input_bytes, stdout=subprocess.PIPE, cwd=cwd,
+                          check=True).stdout.decode('utf-8')
+
+
+def dispatch(command_string, cwd=None):
+    return dispatch_argv(shlex.split(command_string), cwd=cwd)
+
+
+def tag(sha1, tag_name, cwd=None):
+    dispatch_argv(['git', 'tag', tag_name, sha1], cwd=cwd)
+
+
+def create_commit(mess, parents, cwd=None):
+    """ Create a commit of the empty tree and advance HEAD to it.
+
+    Uses plumbing only, so neither the index nor the working tree
+    are touched; a merge is simply a commit with more than one parent.
+
+    """
+    argv = ['git', 'commit-tree', EMPTY_TREE, '-m', mess]
+    for parent in parents:
+        argv += ['-p', parent]
+    sha1 = dispatch_argv(argv, cwd=cwd).rstrip()
+    dispatch_argv(['git', 'update-ref', 'HEAD', sha1], cwd=cwd)
+    return sha1
+
+
+def start_head_resolver(cwd):
+    """ Start a long-lived 'git cat-file' process to answer get_head_sha. """
+    return subprocess.Popen(['git', 'cat-file', '--batch-check=%(objectname)'],
+                            stdin=subprocess.PIPE,
+                            stdout=subprocess.PIPE,
+                            cwd=cwd)
+
+
+def stop_head_resolver(process):
+    process.stdin.close()
+    process.stdout.close()
+    process.wait()
 
 
-def dispatch(command_string):
-    return gbp.get_command_output(shlex.split(command_string))
+def get_head_sha(head_resolver):
+    """ Resolve HEAD via a process of start_head_resolver, None while unborn.
 
+    Rather than running 'git rev-parse' each time, lookups are answered by
+    the same long-lived 'git cat-file' process.
 
-def tag(sha1, tag_name):
-    dispatch(f'git tag {tag_name} {sha1}')
+    """
+    head_resolver.stdin.write(b'HEAD\n')
+    head_resolver.stdin.flush()
+    answer = head_resolver.stdout.readline().decode('utf-8').rstrip()
+    return None if answer.endswith(' missing') else answer
 
 
-def get_head_sha():
-    return dispatch('git rev-parse HEAD').rstrip()
+def switch_branch(name, create_from=None, cwd=None):
+    """ Point HEAD at branch name, first creating it at create_from if given.
 
+    Unlike 'git checkout', this leaves index and working tree alone; they
+    are of no interest since all test commits are of the empty tree.
 
-def empty_commit(mess):
-    dispatch('git commit --allow-empty -m %s' % mess)
-    return get_head_sha()
+    """
+    ref = f'refs/heads/{name}'
+    if create_from is not None:
+        dispatch_argv(['git', 'update-ref', ref, create_from], cwd=cwd)
+    dispatch_argv(['git', 'symbolic-ref', 'HEAD', ref], cwd=cwd)
+
+
+def build_graph(spec, cwd=None):
+    """ Create a whole DAG of empty commits using a single 'git fast-import'.
+
+    Parameters
+    ----------
+    spec : list of tuples (mark, message, parents, refs)
+        mark : int
+            positive number identifying the commit within the spec
+        message : string
+            the commit message
+        parents : list of ints
+            marks of the parent commits, listed earlier in the spec
+        refs : list of strings
+            full names of refs to point at the commit, e.g. 'refs/tags/0.1'
+    cwd : string
+        the git repository to create the commits in
+
+    Returns
+    -------
+    sha1s : dict mapping ints to strings
+        mapping of marks to commit sha1s
+
+    """
+    committer = f'git-big-picture <git-big-picture@example.org> {int(time.time())} +0000'
+    commands = []
+    ref_commands = []
+    for mark, message, parents, refs in spec:
+        message_bytes = message.encode('utf-8')
+        # Start over, so that commits without parents become roots
+        commands.append(f'reset {_BUILD_GRAPH_REF}')
+        commands.append(f'commit {_BUILD_GRAPH_REF}')
+        commands.append(f'mark :{mark}')
+        commands.append(f'committer {committer}')
+        commands.append(f'data {len(message_bytes)}')
+        commands.append(message)
+        commands.extend(f'{"merge" if i else "from"} :{parent}'
+                        for i, parent in enumerate(parents))
+        for ref in refs:
+            ref_commands.append(f'reset {ref}')
+            ref_commands.append(f'from :{mark}')
+    commands.extend(ref_commands)
+    commands.append(f'reset {_BUILD_GRAPH_REF}')
+    commands.append(f'from {NULL_SHA1}')
+    commands.extend(f'get-mark :{mark}' for mark, _, _, _ in spec)
+
+    stream = ''.join(f'{command}\n' for command in commands)
+    output = dispatch_argv_with_input(['git', 'fast-import', '--quiet'],
+                                      stream.encode('utf-8'),
+                                      cwd=cwd)
+    return dict(zip((mark for mark, _, _, _ in spec), output.split()))
+
+
+class EdgeCounter:
+    """ Stand-in for sys.stdout that only counts Graphviz edges written. """
+
+    def __init__(self):
+        self.edge_count = 0
+
+    def write(self, text):
+        self.edge_count += text.count(' -> ')
+        return len(text)
+
+    def flush(self):
+        pass
 
 
 class _GitRepoTestMixin:
 
+    @classmethod
+    def setUpClass(cls):
+        """ Prepare a template git repo once for all tests of the class.
+
+        The template and the repos of all tests of the class live in a
+        single scratch directory that is removed in one go at the very end.
+
+        """
+        super().setUpClass()
+        cls._scratch_dir = tf.mkdtemp(prefix=f'gbp-{_WORKER_ID}-', dir=_SCRATCH_DIR)
+        cls.addClassCleanup(sh.rmtree, cls._scratch_dir)
+        cls._template_dir = os.path.join(cls._scratch_dir, 'template')
+        os.mkdir(cls._template_dir)
+        cls.populate_template(cls._template_dir)
+
+    @classmethod
+    def populate_template(cls, repo_dir):
+        """ Initialise git repo at repo_dir, and set some options.
+
+        Override to have additional content copied into every test repo.
+
+        """
+        dispatch('git init', cwd=repo_dir)
+        dispatch('git config user.name git-big-picture', cwd=repo_dir)
+        dispatch('git config user.email git-big-picture@example.org', cwd=repo_dir)
+        # Durability and housekeeping are of no use for throw-away repos
+        dispatch('git config core.fsync none', cwd=repo_dir)
+        dispatch('git config gc.auto 0', cwd=repo_dir)
+        dispatch('git config core.logAllRefUpdates false', cwd=repo_dir)
+
     def setUp(self):
         """ Setup testing environment.
 
-        Create temporary directory, initialise git repo, and set some options.
+        Create temporary directory and fill it with a copy of the template repo.
 
         """
-        self.testing_dir = tf.mkdtemp(prefix='gbp-testing-', dir="/tmp")
-        self.oldpwd = os.getcwd()
-        os.chdir(self.testing_dir)
-
-        dispatch('git init')
-        dispatch('git config user.name git-big-picture')
-        dispatch('git config user.email git-big-picture@example.org')
+        self.testing_dir = tf.mkdtemp(prefix='testing-', dir=self._scratch_dir)
+        sh.copytree(self._template_dir, self.testing_dir, symlinks=True, dirs_exist_ok=True)
+        self._head_resolver = None
 
-    def tearDown(self):
-        """ Remove testing environment """
-        sh.rmtree(self.testing_dir)
-        os.chdir(self.oldpwd)
+    def empty_commit(self, mess):
+        """ Commit the empty tree on top of HEAD of the testing repo. """
+        if self._head_resolver is None:
+            self._head_resolver = start_head_resolver(self.testing_dir)
+            self.addCleanup(stop_head_resolver, self._head_resolver)
+        head_sha = get_head_sha(self._head_resolver)
+        parents = [] if head_sha is None else [head_sha]
+        return create_commit(mess, parents, cwd=self.testing_dir)
 
 
 class RunGraphvizCommandTest(ut.TestCase):
@@ -99,31 +271,26 @@ class RunGraphvizCommandTest(ut.TestCase):
     def test_non_zero_exit(self):
         magic_exit_code = 123  # arbitrary
         argv = ['bash', '-c', "echo $'hello\\nworld' >&2; false"]
-        expected_stderr = dedent("""\
-            fatal: 'bash' terminated prematurely with error code 1.
-            The error from 'bash' was:
-            >>>hello
-            world
-
-        """)
 
         with patch('sys.exit', self._custom_sys_exit), \
                 patch('sys.stderr', StringIO()) as stderr, \
                 self.assertRaises(SystemExit):
             gbp.run_graphviz_command(argv, [], 0, magic_exit_code, 0)
 
-        self.assertEqual(stderr.getvalue(), expected_stderr)
+        self.assertEqual(stderr.getvalue(), _EXPECTED_STDERR_NONZERO)
         self.assertEqual(self._exit_value, magic_exit_code)
 
     def test_exception_handled(self):
         magic_exit_code = 123  # arbitrary
         expected_stderr = "fatal: A problem occurred calling 'true'\n"
 
-        with patch('subprocess.Popen', side_effect=OSError(1, 2, 3)), \
-                patch('sys.exit', self._custom_sys_exit), \
+        def failing_popen(*args, **kwargs):
+            raise OSError(1, 2, 3)
+
+        with patch('sys.exit', self._custom_sys_exit), \
                 patch('sys.stderr', StringIO()) as stderr, \
                 self.assertRaises(SystemExit):
-            gbp.run_graphviz_command(['true'], [], 0, 0, magic_exit_code)
+            gbp.run_graphviz_command(['true'], [], 0, 0, magic_exit_code, _popen=failing_popen)
 
         self.assertEqual(stderr.getvalue(), expected_stderr)
         self.assertEqual(self._exit_value, magic_exit_code)
@@ -131,8 +298,9 @@ class RunGraphvizCommandTest(ut.TestCase):
 
 class SimplificationTest(_GitRepoTestMixin, ut.TestCase):
 
-    def setUp(self):
-        super().setUp()
+    @classmethod
+    def populate_template(cls, repo_dir):
+        super().populate_template(repo_dir)
         r"""
         Now create this graph:
 
@@ -144,60 +312,66 @@ class SimplificationTest(_GitRepoTestMixin, ut.TestCase):
         "implied by transitivity" and hence will be removed
         during simplification.
         """
-        empty_commit('A')
-        dispatch('git checkout -b topic')
-        empty_commit('B')
-        dispatch('git checkout master')
-        dispatch('git merge --no-ff topic')
+        spec = [
+            (1, 'A', [], []),
+            (2, 'B', [1], ['refs/heads/topic']),
+            (3, 'C', [1, 2], ['refs/heads/master']),
+        ]
+        build_graph(spec, cwd=repo_dir)
 
-    @parameterized.expand([
-        ('with simplify', ['--simplify'], 1),
-        ('without simplify', [], 0),
-    ])
-    def test(self, _label, extra_argv, expected_dropped_edges):
-        opts = gbp.create_parser().parse_args(['--graphviz'] + extra_argv)
+    def test(self):
+        cases = [
+            ('with simplify', ['--simplify'], 1),
+            ('without simplify', [], 0),
+        ]
+        for label, extra_argv, expected_dropped_edges in cases:
+            with self.subTest(label):
+                opts = _PARSER.parse_args(['--graphviz'] + extra_argv + [self.testing_dir])
 
-        with patch('sys.stdout', StringIO()) as stdout:
-            gbp.innermost_main(opts)
+                with patch('sys.stdout', EdgeCounter()) as stdout:
+                    gbp.innermost_main(opts)
 
-        expected_edge_count = 3 - expected_dropped_edges
-        actual_edge_count = stdout.getvalue().count(' -> ')
-        self.assertEqual(actual_edge_count, expected_edge_count)
+                expected_edge_count = 3 - expected_dropped_edges
+                self.assertEqual(stdout.edge_count, expected_edge_count)
 
 
 class TestGitTools(_GitRepoTestMixin, ut.TestCase):
 
-    @property
-    def graph(self):
+    def rebuild_graph(self):
+        """ Read the commit graph from the testing repo.
+
+        This runs git several times, so call it once after the last change
+        to the repo and reuse the result.
+
+        """
         return gbp.graph_factory(self.testing_dir)
 
     def test_find_roots(self):
 
         def create_root(branch_name):
-            dispatch('git read-tree --empty')
-            new_tree = dispatch('git write-tree').strip()
-            new_commit = dispatch('git commit-tree %s -m empty' % new_tree).strip()
-            dispatch(f'git branch {branch_name} {new_commit}')
+            new_commit = dispatch_argv(['git', 'commit-tree', EMPTY_TREE, '-m', 'empty'],
+                                       cwd=self.testing_dir).strip()
+            dispatch_argv(['git', 'branch', branch_name, new_commit], cwd=self.testing_dir)
             return new_commit
 
-        a = empty_commit('a')
-        empty_commit('b')
-        graph = self.graph
+        a = self.empty_commit('a')
+        self.empty_commit('b')
+        graph = self.rebuild_graph()
         self.assertEqual(graph.roots, [a])
         c = create_root('C')
-        graph = self.graph
+        graph = self.rebuild_graph()
         self.assertEqual(set(graph.roots), {a, c})
         d = create_root('D')
-        graph = self.graph
+        graph = self.rebuild_graph()
         self.assertEqual(set(graph.roots), {a, c, d})
         e = create_root('E')
-        graph = self.graph
+        graph = self.rebuild_graph()
         self.assertEqual(set(graph.roots), {a, c, d, e})
 
     def test_filter_roots(self):
-        a = empty_commit('a')
-        b = empty_commit('b')
-        graph = self.graph
+        a = self.empty_commit('a')
+        b = self.empty_commit('b')
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter(roots=True)
         expected_parents = {
             a: set(),
@@ -214,14 +388,13 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
              \     /
               --C--
         """
-        a = empty_commit('a')
-        empty_commit('b')
-        dispatch('git checkout -b other HEAD^')
-        empty_commit('c')
-        dispatch('git merge master')
-        d = get_head_sha()
-
-        graph = self.graph
+        a = self.empty_commit('a')
+        b = self.empty_commit('b')
+        switch_branch('other', create_from='HEAD^', cwd=self.testing_dir)
+        c = self.empty_commit('c')
+        d = create_commit('d', [c, b], cwd=self.testing_dir)
+
+        graph = self.rebuild_graph()
         self.assertEqual(set(graph.merges), {d})
         self.assertEqual(set(graph.bifurcations), {a})
 
@@ -234,12 +407,11 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
              \     /
               --C--
         """
-        a = empty_commit('a')
-        b = empty_commit('b')
-        dispatch('git checkout -b other HEAD^')
-        c = empty_commit('c')
-        dispatch('git merge --no-ff master')
-        d = get_head_sha()
+        a = self.empty_commit('a')
+        b = self.empty_commit('b')
+        switch_branch('other', create_from='HEAD^', cwd=self.testing_dir)
+        c = self.empty_commit('c')
+        d = create_commit('d', [c, b], cwd=self.testing_dir)
 
         expected_parents = {
             a: set(),
@@ -259,11 +431,11 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
         No ref pointing to B, thus it should be removed.
 
         """
-        a = empty_commit('A')
-        dispatch('git branch one')
-        empty_commit('B')
-        c = empty_commit('C')
-        graph = self.graph
+        a = self.empty_commit('A')
+        dispatch('git branch one', cwd=self.testing_dir)
+        self.empty_commit('B')
+        c = self.empty_commit('C')
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter()
         expected_reduced_parents = {
             a: set(),
@@ -279,14 +451,14 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
                0.1            master
 
         """
-        a = empty_commit('A')
-        b = empty_commit('B')
-        dispatch('git tag 0.1')
-        empty_commit('C')
-        empty_commit('D')
-        empty_commit('E')
-        f = empty_commit('F')
-        graph = self.graph
+        a = self.empty_commit('A')
+        b = self.empty_commit('B')
+        dispatch('git tag 0.1', cwd=self.testing_dir)
+        self.empty_commit('C')
+        self.empty_commit('D')
+        self.empty_commit('E')
+        f = self.empty_commit('F')
+        graph = self.rebuild_graph()
         # use the defaults
         filterd_graph = graph.filter()
         expected_reduced_parents = {
@@ -312,22 +484,20 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
         """ Test for tree-tag and a blob-tag.
         """
 
-        a = empty_commit('A')
-        f = open('foo', 'w')
-        f.writelines('bar')
-        f.close()
-        blob_hash = dispatch('git hash-object -w foo').rstrip()
-        dispatch('git tag -m "blob-tag" blob-tag ' + blob_hash)
-        os.mkdir('baz')
-        f = open('baz/foo', 'w')
-        f.writelines('bar')
-        f.close()
-        dispatch('git add baz/foo')
-        tree_hash = dispatch('git write-tree --prefix=baz').rstrip()
-        dispatch('git tag -m "tree-tag" tree-tag ' + tree_hash)
-        dispatch('git reset')
-
-        graph = self.graph
+        a = self.empty_commit('A')
+        blob_hash = dispatch_argv_with_input(['git', 'hash-object', '-w', '--stdin'],
+                                             b'bar',
+                                             cwd=self.testing_dir).rstrip()
+        dispatch('git tag -m "blob-tag" blob-tag ' + blob_hash, cwd=self.testing_dir)
+        # The tree reuses the blob already written rather than hashing a file
+        dispatch_argv(
+            ['git', 'update-index', '--add', '--cacheinfo', '100644', blob_hash, 'baz/foo'],
+            cwd=self.testing_dir)
+        tree_hash = dispatch('git write-tree --prefix=baz', cwd=self.testing_dir).rstrip()
+        dispatch('git tag -m "tree-tag" tree-tag ' + tree_hash, cwd=self.testing_dir)
+        dispatch('git reset', cwd=self.testing_dir)
+
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter()
         expected_reduced_parents = {
             blob_hash: set(),
@@ -353,22 +523,21 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
              ------
 
         """
-        a = empty_commit('A')
-        tag(a, '0.1')
-        empty_commit('B')
-        c = empty_commit('C')
-        d = empty_commit('D')
-        tag(d, '0.2')
-        empty_commit('E')
-
-        dispatch('git checkout -b topic %s' % c)
-        empty_commit('G')
-        dispatch('git checkout master')
-        dispatch('git merge topic')
-        f = get_head_sha()
-        dispatch('git branch -d topic')
-
-        graph = self.graph
+        a = self.empty_commit('A')
+        tag(a, '0.1', cwd=self.testing_dir)
+        self.empty_commit('B')
+        c = self.empty_commit('C')
+        d = self.empty_commit('D')
+        tag(d, '0.2', cwd=self.testing_dir)
+        e = self.empty_commit('E')
+
+        switch_branch('topic', create_from=c, cwd=self.testing_dir)
+        g = self.empty_commit('G')
+        switch_branch('master', cwd=self.testing_dir)
+        f = create_commit('F', [e, g], cwd=self.testing_dir)
+        dispatch('git branch -d topic', cwd=self.testing_dir)
+
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter()
         expected_reduced_parents = {
             d: {a},
@@ -393,21 +562,20 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
                      topic
 
         """
-        a = empty_commit('A')
-        tag(a, '0.0')
-        b = empty_commit('B')
-        tag(b, '0.1')
-        c = empty_commit('C')
-        empty_commit('D')
-        empty_commit('E')
-        dispatch('git checkout -b topic %s' % c)
-        empty_commit('N')
-        empty_commit('O')
-        p = empty_commit('P')
-        dispatch('git checkout master')
-        dispatch('git merge topic')
-        f = get_head_sha()
-        graph = self.graph
+        spec = [
+            (1, 'A', [], ['refs/tags/0.0']),
+            (2, 'B', [1], ['refs/tags/0.1']),
+            (3, 'C', [2], []),
+            (4, 'D', [3], []),
+            (5, 'E', [4], []),
+            (6, 'N', [3], []),
+            (7, 'O', [6], []),
+            (8, 'P', [7], ['refs/heads/topic']),
+            (9, 'F', [5, 8], ['refs/heads/master']),
+        ]
+        sha1s = build_graph(spec, cwd=self.testing_dir)
+        a, b, p, f = (sha1s[mark] for mark in (1, 2, 8, 9))
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter()
         expected_reduced_parents = {
             b: {a},
@@ -415,7 +583,7 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
             f: {p, b},
             p: {b},
         }
-        dispatch(f"git log --oneline {f}..{p}")
+        dispatch(f"git log --oneline {f}..{p}", cwd=self.testing_dir)
         self.assertEqual(expected_reduced_parents, filterd_graph.parents)
 
     def test_more_realistic(self):
@@ -438,31 +606,27 @@ class TestGitTools(_GitRepoTestMixin, ut.TestCase):
                     \     /
                      topic
         """
-        a = empty_commit('A')
-        tag(a, '0.0')
-        b = empty_commit('B')
-        tag(b, '0.1')
-        c = empty_commit('C')
-        empty_commit('D')
-        empty_commit('E')
-        dispatch('git checkout -b maint %s' % b)
-        empty_commit('G')
-        h = empty_commit('H')
-        tag(h, '0.1.1')
-        empty_commit('I')
-        j = empty_commit('J')
-        tag(j, '0.1.2')
-        empty_commit('K')
-        empty_commit('L')
-        m = empty_commit('M')
-        dispatch('git checkout -b topic %s' % c)
-        empty_commit('N')
-        empty_commit('O')
-        p = empty_commit('P')
-        dispatch('git checkout master')
-        dispatch('git merge topic')
-        f = get_head_sha()
-        graph = self.graph
+        spec = [
+            (1, 'A', [], ['refs/tags/0.0']),
+            (2, 'B', [1], ['refs/tags/0.1']),
+            (3, 'C', [2], []),
+            (4, 'D', [3], []),
+            (5, 'E', [4], []),
+            (6, 'G', [2], []),
+            (7, 'H', [6], ['refs/tags/0.1.1']),
+            (8, 'I', [7], []),
+            (9, 'J', [8], ['refs/tags/0.1.2']),
+            (10, 'K', [9], []),
+            (11, 'L', [10], []),
+            (12, 'M', [11], ['refs/heads/maint']),
+            (13, 'N', [3], []),
+            (14, 'O', [13], []),
+            (15, 'P', [14], ['refs/heads/topic']),
+            (16, 'F', [5, 15], ['refs/heads/master']),
+        ]
+        sha1s = build_graph(spec, cwd=self.testing_dir)
+        a, b, h, j, m, p, f = (sha1s[mark] for mark in (1, 2, 7, 9, 12, 15, 16))
+        graph = self.rebuild_graph()
         filterd_graph = graph.filter()
         expected_reduced_parents = {
             m: {j},